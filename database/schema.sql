@@ -0,0 +1,39 @@
+-- Supabase (Postgres 15+) table "forex_rates".
+-- services/supabase.py upserts with on_conflict, which PostgREST can only
+-- resolve against an existing unique constraint on the same columns: until
+-- this script has been run, every upsert (and so every sync) fails.
+--
+-- Rows uploaded before the upserts were introduced contain duplicates, so
+-- each constraint is preceded by a DELETE keeping the first row (MIN(id)) of
+-- every key.
+BEGIN;
+
+-- API and history rows: one row per (currency, timestamptz). Scraped rows
+-- have no currency code (NULL), which default NULLS DISTINCT leaves out.
+DELETE FROM forex_rates a
+USING forex_rates b
+WHERE a.currency = b.currency
+  AND a.timestamptz = b.timestamptz
+  AND a.id > b.id;
+
+ALTER TABLE forex_rates
+    ADD CONSTRAINT forex_rates_currency_timestamptz_key
+    UNIQUE (currency, timestamptz);
+
+-- Scraped rows: one row per (currency_name, timestamptz). currency is part of
+-- the key so API/history rows never collide on it (e.g. CNH and MRU, which
+-- have no currency_name). NULLS NOT DISTINCT makes the NULL currency of
+-- scraped rows compare equal. A partial unique index (WHERE currency IS NULL)
+-- cannot be used: PostgREST's on_conflict does not pass the index predicate.
+DELETE FROM forex_rates a
+USING forex_rates b
+WHERE a.currency IS NOT DISTINCT FROM b.currency
+  AND a.currency_name IS NOT DISTINCT FROM b.currency_name
+  AND a.timestamptz = b.timestamptz
+  AND a.id > b.id;
+
+ALTER TABLE forex_rates
+    ADD CONSTRAINT forex_rates_currency_currency_name_timestamptz_key
+    UNIQUE NULLS NOT DISTINCT (currency, currency_name, timestamptz);
+
+COMMIT;
@@ -1,16 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from etl.config import logging
 from .api_fetcher import run_api_process
 from .csv_loader import run_csv_loading_process
 from .web_scraper import run_web_scrapping_process
 
 __version__ = "1.0.0"
 
-# Configurations globales, si nécessaire
-from etl.config import logging
-
 
 def run_etl():
     logging.info("🚀 Running ETL pipeline...")
-    run_api_process()
-    run_csv_loading_process()
-    run_web_scrapping_process()
+    # The stages are I/O-bound and write to separate tables (SQLite is in WAL
+    # mode), so they can overlap instead of running back to back
+    stages = [run_api_process, run_csv_loading_process, run_web_scrapping_process]
+    with ThreadPoolExecutor(max_workers=len(stages)) as executor:
+        futures = [executor.submit(stage) for stage in stages]
+        for future in futures:
+            future.result()
     logging.info("✅ ETL pipeline completed.")
@@ -1,26 +1,39 @@
+import argparse
+import json
 import pandas as pd
 import requests
 import sqlite3
-import pytz
 
-from datetime import datetime
+from pathlib import Path
+from datetime import date, datetime, timezone
 from typing import Dict, Optional, Any
-from tabulate import tabulate
+from requests.adapters import HTTPAdapter
 
 from etl.config import (
     logging,
     DB_PATH,
     CSV_FILE_PATH,
+    API_STATE_PATH,
     API_URL,
+    REQUEST_TIMEOUT,
     DEFAULT_CURRENCY,
     API_TABLE_NAME,
     API_UPDATE_TIME,
     CET_TIMEZONE,
+    SQLITE_MAX_VARIABLES,
+    create_read_indexes,
+    display_last_rows,
+    get_stage_conn,
+    insert_or_ignore,
 )
 
 
 from services.supabase import sync_data
 
+# Reuse the TCP/TLS connection for every request made by this process
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
 
 def ensure_directories() -> bool:
     """Ensure all required directories exist.
@@ -30,27 +43,78 @@ def ensure_directories() -> bool:
     """
     try:
         DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-        CSV_FILE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        API_STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
         return True
     except Exception as e:
         logging.error(f"❌ Error creating directories: {e}")
         return False
 
 
-def fetch_forex_data() -> Optional[Dict[str, Any]]:
+def load_api_state() -> Dict[str, str]:
+    """Load the HTTP validators saved after the last successful ingest.
+
+    Returns:
+        Dict[str, str]: Saved ETag / Last-Modified values (empty if none)
+    """
+    try:
+        return json.loads(API_STATE_PATH.read_text())
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"⚠️ Ignoring unreadable API state file: {e}")
+        return {}
+
+
+def save_api_state(response: requests.Response) -> bool:
+    """Persist the response validators so the next run can send a conditional GET.
+
+    Args:
+        response: API response whose data was ingested
+
+    Returns:
+        bool: True if saved successfully, False otherwise
+    """
+    state = {
+        key: response.headers[key]
+        for key in ("ETag", "Last-Modified")
+        if key in response.headers
+    }
+    try:
+        API_STATE_PATH.write_text(json.dumps(state))
+        return True
+    except OSError as e:
+        logging.error(f"❌ Error saving API state: {e}")
+        return False
+
+
+def fetch_forex_data(state: Dict[str, str]) -> Optional[requests.Response]:
     """Fetch forex data from the Frankfurter API.
 
+    Sends If-None-Match / If-Modified-Since from the saved state, so an
+    unchanged payload comes back as an empty 304 response.
+
+    Args:
+        state: Validators returned by load_api_state()
+
     Returns:
-        Optional[Dict[str, Any]]: Raw JSON response or None if failed
+        Optional[requests.Response]: API response (200 or 304) or None if failed
     """
     params = {"base": DEFAULT_CURRENCY}
+    headers = {}
+    if state.get("ETag"):
+        headers["If-None-Match"] = state["ETag"]
+    if state.get("Last-Modified"):
+        headers["If-Modified-Since"] = state["Last-Modified"]
 
     try:
-        logging.info(f"⌛ Fetching data from API...")
-        response = requests.get(API_URL, params=params)
+        logging.info("⌛ Fetching data from API...")
+        response = _SESSION.get(
+            API_URL, params=params, headers=headers, timeout=REQUEST_TIMEOUT
+        )
         response.raise_for_status()
-        logging.info("✅ Data retrieved successfully from API.")
-        return response.json()
+        if response.status_code != 304:
+            logging.info("✅ Data retrieved successfully from API.")
+        return response
     except requests.RequestException as e:
         logging.error(f"❌ Error retrieving data from API: {e}")
         return None
@@ -67,19 +131,15 @@ def transform_forex_data(raw_data: Dict[str, Any]) -> Optional[pd.DataFrame]:
     """
     try:
         rates = raw_data.get("rates", {})
-        date_str = raw_data.get("date", str(datetime.now().date()))
+        date_str = raw_data.get("date", str(date.today()))
 
         # Build CET datetime at 16:00
-        cet_dt = CET_TIMEZONE.localize(
-            datetime.combine(
-                datetime.strptime(date_str, "%Y-%m-%d"),
-                API_UPDATE_TIME,
-            )
+        cet_dt = datetime.combine(
+            date.fromisoformat(date_str), API_UPDATE_TIME, tzinfo=CET_TIMEZONE
         )
 
         # Convert to UTC
-        utc_dt = cet_dt.astimezone(pytz.utc)
-        utc_timestamptz = utc_dt.isoformat()
+        utc_timestamptz = cet_dt.astimezone(timezone.utc).isoformat()
 
         # Create DataFrame
         df = pd.DataFrame(rates.items(), columns=["currency", "exchange_rate"])
@@ -97,28 +157,6 @@ def transform_forex_data(raw_data: Dict[str, Any]) -> Optional[pd.DataFrame]:
         return None
 
 
-def save_to_csv(df: pd.DataFrame) -> bool:
-    """Save the data to CSV file.
-
-    Args:
-        df: DataFrame to save
-
-    Returns:
-        bool: True if saved successfully, False otherwise
-    """
-    try:
-        if CSV_FILE_PATH.exists():
-            df.to_csv(CSV_FILE_PATH, mode="a", header=False, index=False)
-            logging.info(f"✅ Data appended to {CSV_FILE_PATH}")
-        else:
-            df.to_csv(CSV_FILE_PATH, mode="w", header=True, index=False)
-            logging.info(f"✅ File {CSV_FILE_PATH} created with data.")
-        return True
-    except Exception as e:
-        logging.error(f"❌ Error saving to CSV: {e}")
-        return False
-
-
 def create_table(conn: sqlite3.Connection) -> bool:
     """Create the database table if it doesn't exist.
 
@@ -144,6 +182,7 @@ def create_table(conn: sqlite3.Connection) -> bool:
     try:
         cursor = conn.cursor()
         cursor.execute(create_table_query)
+        create_read_indexes(conn, API_TABLE_NAME, "timestamptz DESC, currency ASC")
         conn.commit()
         logging.info(f"✅ Table {API_TABLE_NAME} created or already exists.")
         return True
@@ -165,28 +204,18 @@ def insert_data(
     Returns:
         int: Number of rows inserted
     """
-    insert_query = f"""
-        INSERT OR IGNORE INTO {API_TABLE_NAME} 
-        (currency, base_currency, exchange_rate, date, timestamptz)
-        VALUES (?, ?, ?, ?, ?)
-    """
-
-    data_to_insert = [
-        (
-            row["currency"],
-            row["base_currency"],
-            row["exchange_rate"],
-            row["date"],
-            row["timestamptz"],
-        )
-        for _, row in df.iterrows()
-    ]
-
     try:
-        cursor = conn.cursor()
-        cursor.executemany(insert_query, data_to_insert)
-        conn.commit()
-        rows_affected = cursor.rowcount
+        rows_affected = (
+            df.to_sql(
+                API_TABLE_NAME,
+                conn,
+                if_exists="append",
+                index=False,
+                method=insert_or_ignore,
+                chunksize=SQLITE_MAX_VARIABLES // len(df.columns),
+            )
+            or 0
+        )
         logging.info(f"✅ {rows_affected} rows inserted into database.")
         return rows_affected
     except sqlite3.Error as e:
@@ -208,26 +237,25 @@ def display_data(conn: sqlite3.Connection) -> None:
         ORDER BY timestamptz DESC, currency ASC
         LIMIT 10;
     """
-
-    try:
-        result_df = pd.read_sql_query(display_query, conn)
-        logging.info("Last 10 inserted rows:")
-        print(tabulate(result_df, headers="keys", tablefmt="fancy_grid"))
-    except sqlite3.Error as e:
-        logging.error(f"❌ Error displaying data: {e}")
+    display_last_rows(conn, display_query)
 
 
-def save_to_local_db(df: pd.DataFrame) -> bool:
+def save_to_local_db(
+    df: pd.DataFrame, conn: Optional[sqlite3.Connection] = None
+) -> bool:
     """Save the data to SQLite database using smaller function calls.
 
     Args:
         df: DataFrame to save
+        conn: SQLite connection (default: the module's shared connection)
 
     Returns:
         bool: True if successful, False otherwise
     """
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        if conn is None:
+            conn = get_stage_conn(API_TABLE_NAME)
+        with conn:
             if not create_table(conn):
                 return False
 
@@ -242,6 +270,43 @@ def save_to_local_db(df: pd.DataFrame) -> bool:
         return False
 
 
+def export_csv(conn: sqlite3.Connection, path: Path = CSV_FILE_PATH) -> bool:
+    """Export the API table to CSV on demand, streaming it in chunks.
+
+    SQLite is the source of truth, so the CSV is only produced when asked
+    for instead of being written alongside the database on every run.
+
+    Args:
+        conn: SQLite connection
+        path: Destination CSV file
+
+    Returns:
+        bool: True if exported successfully, False otherwise
+    """
+    export_query = f"""
+        SELECT currency, base_currency, exchange_rate, date, timestamptz
+        FROM {API_TABLE_NAME}
+        ORDER BY timestamptz ASC, currency ASC
+    """
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        rows_exported = 0
+        for chunk in pd.read_sql_query(export_query, conn, chunksize=10000):
+            chunk.to_csv(
+                path,
+                mode="w" if rows_exported == 0 else "a",
+                header=rows_exported == 0,
+                index=False,
+            )
+            rows_exported += len(chunk)
+        logging.info(f"✅ {rows_exported} rows exported to {path}")
+        return True
+    except (sqlite3.Error, OSError) as e:
+        logging.error(f"❌ Error exporting to CSV: {e}")
+        return False
+
+
 def run_api_process() -> None:
     """Main ETL pipeline function."""
     logging.info(f"⚙️ Starting ETL:API pipeline with {API_URL}")
@@ -250,19 +315,31 @@ def run_api_process() -> None:
         logging.error("❌ Failed to create necessary directories. Exiting.")
         return
 
-    raw_data = fetch_forex_data()
-    if not raw_data:
+    response = fetch_forex_data(load_api_state())
+    if response is None:
         logging.error("❌ Failed to fetch data. Exiting.")
         return
 
+    if response.status_code == 304:
+        logging.info("✅ API data unchanged since last run. Nothing to do.")
+        return
+
+    try:
+        raw_data = response.json()
+    except ValueError as e:
+        logging.error(f"❌ Invalid JSON received from API: {e}")
+        return
+
     df = transform_forex_data(raw_data)
 
     if df is not None:
-        csv_success = save_to_csv(df)
         db_success = save_to_local_db(df)
-        sync_data(DB_PATH, API_TABLE_NAME, source="api")
+        sync_data(
+            DB_PATH, API_TABLE_NAME, source="api", on_conflict="currency,timestamptz"
+        )
 
-        if csv_success and db_success:
+        if db_success:
+            save_api_state(response)
             logging.info("✅ ETL:API process completed successfully.")
         else:
             logging.warning("⚠️ ETL:API process completed with warnings.")
@@ -271,4 +348,15 @@ def run_api_process() -> None:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the ETL:API pipeline.")
+    parser.add_argument(
+        "--export-csv",
+        action="store_true",
+        help=f"export {API_TABLE_NAME} to {CSV_FILE_PATH} after the run",
+    )
+    args = parser.parse_args()
+
     run_api_process()
+
+    if args.export_csv:
+        export_csv(get_stage_conn(API_TABLE_NAME))
@@ -1,12 +1,19 @@
+import atexit
 import logging
-import pytz
+import os
+import sqlite3
+import threading
 
 from pathlib import Path
+from typing import Dict
 from datetime import time
+from zoneinfo import ZoneInfo
+from tabulate import tabulate
 
-# Logger configuration
+# Logger configuration (ETL_VERBOSE=1 enables DEBUG output such as the
+# sample tables printed after each insert)
 logging.basicConfig(
-    level=logging.INFO,
+    level=logging.DEBUG if os.getenv("ETL_VERBOSE") else logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s",
     handlers=[logging.StreamHandler()],
 )
@@ -17,6 +24,7 @@ DEFAULT_CURRENCY = "EUR"
 RAW_CSV_FILE_URL = "https://www.kaggle.com/datasets/asaniczka/forex-exchange-rate-since-2004-updated-daily/versions/529/data"
 WEBPAGE_URL = f"https://www.x-rates.com/table/?from={DEFAULT_CURRENCY}&amount=1"
 API_URL = "https://api.frankfurter.app/latest"
+REQUEST_TIMEOUT = 10  # seconds
 
 DB_PATH = Path("database/forex_data.db")
 PROCESSED_FILES_PATH = Path("data/processed")
@@ -26,8 +34,167 @@ HISTORY_TABLE_NAME = "forex_rates_history"
 WEB_SCRAPPER_TABLE_NAME = "forex_rates_scraped"
 
 RAW_CSV_FILE_PATH = Path("data/raw/daily_forex_rates.csv")
+# Columns and dtypes read from the history CSV (low-cardinality text as category)
+HISTORY_CSV_COLUMNS = [
+    "currency",
+    "base_currency",
+    "currency_name",
+    "exchange_rate",
+    "date",
+]
+HISTORY_CSV_DTYPES = {
+    "currency": "category",
+    "base_currency": "category",
+    "currency_name": "category",
+    "exchange_rate": "float64",
+}
 CSV_FILE_PATH = Path("data/processed/forex_api.csv")
+# HTTP validators (ETag / Last-Modified) from the last successful API ingest
+API_STATE_PATH = Path("data/processed/api_state.json")
 
 
 API_UPDATE_TIME = time(hour=16, minute=0)
-CET_TIMEZONE = pytz.timezone("CET")
+CET_TIMEZONE = ZoneInfo("Europe/Paris")
+
+# SQLite tuning applied to every ETL connection: WAL + synchronous=NORMAL
+# keeps commits crash-safe without a full fsync each time
+SQLITE_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-65536;
+    PRAGMA mmap_size=268435456;
+"""
+
+# Bound parameters per statement (SQLITE_MAX_VARIABLE_NUMBER on older builds)
+SQLITE_MAX_VARIABLES = 999
+
+# Seconds a writer waits for the lock (run_etl runs the stages concurrently and
+# WAL allows a single writer; the initial history load can hold it a while)
+SQLITE_BUSY_TIMEOUT = 60
+
+
+def open_db(path: Path = DB_PATH, **kwargs) -> sqlite3.Connection:
+    """Open a SQLite connection with the ETL PRAGMAs applied.
+
+    Args:
+        path: Path to the SQLite database file
+        **kwargs: Extra arguments for sqlite3.connect (e.g. check_same_thread)
+
+    Returns:
+        sqlite3.Connection: Tuned connection
+    """
+    kwargs.setdefault("timeout", SQLITE_BUSY_TIMEOUT)
+    conn = sqlite3.connect(path, cached_statements=256, **kwargs)
+    conn.executescript(SQLITE_PRAGMAS)
+    return conn
+
+
+_STAGE_CONNS: Dict[str, sqlite3.Connection] = {}
+_STAGE_CONNS_LOCK = threading.Lock()
+
+
+def get_stage_conn(name: str) -> sqlite3.Connection:
+    """Return the shared connection of an ETL stage, opening it on first use.
+
+    Each stage keeps its connection for the life of the process, so repeated
+    runs skip the connect and PRAGMA setup; it is closed at exit. Stages get
+    separate connections, opened with check_same_thread=False because run_etl
+    may call a stage from a different pool thread on each run (a stage never
+    uses its connection from two threads at once).
+
+    Args:
+        name: Stage name (e.g. its table name)
+
+    Returns:
+        sqlite3.Connection: Shared connection for that stage
+    """
+    with _STAGE_CONNS_LOCK:
+        conn = _STAGE_CONNS.get(name)
+        if conn is None:
+            conn = open_db(DB_PATH, check_same_thread=False)
+            atexit.register(conn.close)
+            _STAGE_CONNS[name] = conn
+        return conn
+
+
+def insert_or_ignore(table, conn, keys, data_iter) -> int:
+    """pandas `to_sql` method writing each chunk as one multi-row INSERT OR IGNORE.
+
+    Args:
+        table: pandas SQLTable being written
+        conn: DB-API cursor provided by pandas
+        keys: Column names
+        data_iter: Row tuples for the current chunk
+
+    Returns:
+        int: Number of rows inserted
+    """
+    rows = list(data_iter)
+    if not rows:
+        return 0
+
+    placeholders = f"({', '.join('?' * len(keys))})"
+    query = (
+        f"INSERT OR IGNORE INTO {table.name} ({', '.join(keys)}) "
+        f"VALUES {', '.join([placeholders] * len(rows))}"
+    )
+    conn.execute(query, [value for row in rows for value in row])
+    return conn.rowcount
+
+
+def create_read_indexes(
+    conn: sqlite3.Connection, table_name: str, order_by: str
+) -> None:
+    """Create the indexes behind the reads every ETL table gets.
+
+    - An index on the ORDER BY of the table's display_data (e.g.
+      "timestamptz DESC, currency ASC"), so its LIMIT 10 reads the last rows
+      from the index instead of sorting the whole table.
+    - A created_at index, so sync_data's "created_at > last sync" filter is a
+      range scan instead of a full table scan.
+
+    Args:
+        conn: SQLite connection
+        table_name: Table to index
+        order_by: ORDER BY clause of the table's display_data
+
+    Raises:
+        sqlite3.Error: If an index cannot be created
+    """
+    order_columns = "_".join(term.split()[0] for term in order_by.split(","))
+    conn.execute(
+        f"""
+        CREATE INDEX IF NOT EXISTS idx_{table_name}_{order_columns}
+        ON {table_name}({order_by})
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE INDEX IF NOT EXISTS idx_{table_name}_created_at
+        ON {table_name}(created_at)
+        """
+    )
+
+
+def display_last_rows(conn: sqlite3.Connection, query: str) -> None:
+    """Print the rows returned by a display query as a table.
+
+    The sample table is for interactive debugging only: unless DEBUG logging is
+    enabled (ETL_VERBOSE=1), neither the query nor the formatting runs.
+
+    Args:
+        conn: SQLite connection
+        query: SELECT returning the rows to show
+    """
+    if not logging.getLogger().isEnabledFor(logging.DEBUG):
+        return
+
+    try:
+        cursor = conn.execute(query)
+        rows = cursor.fetchall()
+        headers = [column[0] for column in cursor.description]
+        logging.debug("Last 10 inserted rows:")
+        print(tabulate(rows, headers=headers, tablefmt="fancy_grid"))
+    except sqlite3.Error as e:
+        logging.error(f"❌ Error displaying data: {e}")
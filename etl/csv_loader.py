@@ -1,22 +1,51 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 import sqlite3
-import pytz
 
 from typing import Optional
-from pathlib import Path
-from tabulate import tabulate
 
 from etl.config import (
     logging,
     DB_PATH,
     PROCESSED_FILES_PATH,
     RAW_CSV_FILE_PATH,
+    HISTORY_CSV_COLUMNS,
+    HISTORY_CSV_DTYPES,
     HISTORY_TABLE_NAME,
+    SQLITE_MAX_VARIABLES,
+    create_read_indexes,
+    display_last_rows,
+    get_stage_conn,
+    insert_or_ignore,
 )
 
 
 from services.supabase import sync_data
 
+# Built once at import; SQLite's statement cache keeps them compiled across calls
+HISTORY_CREATE_TABLE_QUERY = f"""
+    CREATE TABLE IF NOT EXISTS {HISTORY_TABLE_NAME} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        currency TEXT NOT NULL,
+        base_currency TEXT NOT NULL,
+        currency_name TEXT,
+        exchange_rate REAL NOT NULL,
+        date TEXT,
+        timestamptz TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+HISTORY_INSERT_QUERY = f"""
+    INSERT OR IGNORE INTO {HISTORY_TABLE_NAME}
+    (currency, base_currency, currency_name, exchange_rate, date, timestamptz)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+INSERT_CHUNK_SIZE = 10000
+RAW_CSV_BLOCK_SIZE = 8 << 20  # bytes per streamed CSV block
+
 
 def ensure_directories() -> bool:
     """Ensure required directories exist.
@@ -33,40 +62,117 @@ def ensure_directories() -> bool:
         return False
 
 
-def process_raw_csv_file(months: int = 2) -> Optional[Path]:
+def _is_newest_first(dates: pa.Array, previous_min: Optional[pa.Scalar]) -> bool:
+    """Check that a block of dates is in descending order and follows the previous block.
+
+    Args:
+        dates: Date column of the current block
+        previous_min: Oldest date seen in the previous blocks, if any
+
+    Returns:
+        True if the block keeps the file in newest-first order, False otherwise
+    """
+    if len(dates) > 1:
+        descending = pc.all(pc.greater_equal(dates[:-1], dates[1:])).as_py()
+        if descending is False:
+            return False
+
+    batch_max = pc.max(dates)
+    if previous_min is not None and batch_max.is_valid:
+        return pc.less_equal(batch_max, previous_min).as_py()
+
+    return True
+
+
+def process_raw_csv_file(
+    months: int = 2, keep_intermediate: bool = False
+) -> Optional[pd.DataFrame]:
     """
-    Get data from the raw CSV file for the specified number of months and save it to the processed directory.
+    Get data from the raw CSV file for the specified number of months.
 
     Args:
         months: Number of months of data to extract (default: 2)
+        keep_intermediate: Also save the extracted rows to the processed directory
 
     Returns:
-        Path to the processed CSV file if successful, None otherwise
+        DataFrame with the extracted rows if successful, None otherwise
     """
     try:
         logging.info(f"⌛ Processing raw CSV file: {RAW_CSV_FILE_PATH}")
-        # Read the raw CSV file
-        df = pd.read_csv(RAW_CSV_FILE_PATH)
-
-        # Convert 'date' column to datetime format
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-
         today = pd.Timestamp.today()
         start_date = today - pd.DateOffset(months=months)
 
-        # Filter data for the specified date range
-        df_recent = df[(df["date"] >= start_date) & (df["date"] <= today)]
-
-        output_csv = PROCESSED_FILES_PATH / f"forex_rates_{months}m.csv"
-
-        # Save filtered data
-        df_recent.to_csv(output_csv, index=False)
+        # Stream the raw CSV file through Arrow's C++ reader (only the columns
+        # we load, with known types) and keep each block's rows for the
+        # specified date range, so peak memory is one block plus the slice.
+        # Empty strings are read as nulls (like pd.read_csv) and dates are
+        # parsed per block so a malformed one becomes null instead of failing
+        # the whole load; null dates are then dropped by the range filter.
+        reader = pacsv.open_csv(
+            RAW_CSV_FILE_PATH,
+            read_options=pacsv.ReadOptions(block_size=RAW_CSV_BLOCK_SIZE),
+            convert_options=pacsv.ConvertOptions(
+                include_columns=HISTORY_CSV_COLUMNS,
+                column_types={
+                    "date": pa.string(),
+                    "exchange_rate": pa.float64(),
+                },
+                strings_can_be_null=True,
+            ),
+        )
+        date_index = reader.schema.get_field_index("date")
+        schema = reader.schema.set(date_index, pa.field("date", pa.timestamp("ns")))
+        start = pa.scalar(start_date.to_pydatetime(), type=pa.timestamp("ns"))
+        end = pa.scalar(today.to_pydatetime(), type=pa.timestamp("ns"))
+        batches = []
+        newest_first = True
+        previous_min = None
+        for batch in reader:
+            dates = pc.strptime(
+                batch.column("date"), format="%Y-%m-%d", unit="ns", error_is_null=True
+            )
+            columns = batch.columns
+            columns[date_index] = dates
+            batch = pa.RecordBatch.from_arrays(columns, schema=schema)
+            batches.append(
+                batch.filter(
+                    pc.and_(
+                        pc.greater_equal(dates, start),
+                        pc.less_equal(dates, end),
+                    )
+                )
+            )
+
+            # The raw file is published newest first: once every block read so
+            # far is in descending date order and the last one ends before the
+            # start date, the rest of the file is older and can be skipped
+            newest_first = newest_first and _is_newest_first(dates, previous_min)
+            batch_min = pc.min(dates)
+            if batch_min.is_valid:
+                previous_min = batch_min
+            if (
+                newest_first
+                and previous_min is not None
+                and pc.less(previous_min, start).as_py()
+            ):
+                logging.info("✅ Reached rows older than the start date, stopping.")
+                break
+
+        table = pa.Table.from_batches(batches, schema=schema)
+        df_recent = table.to_pandas().astype(HISTORY_CSV_DTYPES)
+
+        if keep_intermediate:
+            output_file = PROCESSED_FILES_PATH / f"forex_rates_{months}m.parquet"
+            df_recent.to_parquet(
+                output_file, engine="pyarrow", compression="zstd", index=False
+            )
+            logging.info(f"✅ Extracted rows saved to {output_file}")
 
         logging.info(
             f"✅ Raw file processed successfully. {len(df_recent)} rows extracted for {start_date.date()} to {today.date()}."
         )
 
-        return output_csv
+        return df_recent
 
     except FileNotFoundError:
         logging.error(f"❌ Raw CSV file not found at {RAW_CSV_FILE_PATH}")
@@ -77,7 +183,7 @@ def process_raw_csv_file(months: int = 2) -> Optional[Path]:
         return None
 
 
-def transform_data(path: Path) -> pd.DataFrame:
+def transform_data(df: pd.DataFrame) -> pd.DataFrame:
     """Clean and format DataFrame.
 
     Args:
@@ -87,20 +193,22 @@ def transform_data(path: Path) -> pd.DataFrame:
         Cleaned DataFrame
     """
     try:
-        df = pd.read_csv(path)
         if df.empty:
             logging.warning("⚠️ Loaded DataFrame is empty.")
             return pd.DataFrame()
 
         logging.info("⌛ Transforming data...")
-        transformed_df = df.copy()
 
-        transformed_df.drop_duplicates(inplace=True)
-        transformed_df.dropna(
-            subset=["currency", "exchange_rate", "date"], inplace=True
+        # Drop incomplete rows and non-positive rates with a single mask over
+        # the raw buffers; NaN rates compare False, so "> 0" also drops them
+        mask = (
+            df["currency"].notna().to_numpy()
+            & df["date"].notna().to_numpy()
+            & (df["exchange_rate"].to_numpy() > 0)
         )
-        transformed_df = transformed_df[transformed_df["exchange_rate"] > 0]
-        transformed_df["date"] = pd.to_datetime(transformed_df["date"], errors="coerce")
+        # Duplicates on (currency, date) are left to the unique index and
+        # INSERT OR IGNORE (see create_indexes for the initial load)
+        transformed_df = df.loc[mask]
 
         # Add timestamptz based on 10:00:00 UTC
         transformed_df["timestamptz"] = (
@@ -120,23 +228,9 @@ def create_table(conn: sqlite3.Connection) -> bool:
     Args:
         conn: SQLite connection
     """
-    create_table_query = f"""
-    CREATE TABLE IF NOT EXISTS {HISTORY_TABLE_NAME} (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        currency TEXT NOT NULL,
-        base_currency TEXT NOT NULL,
-        currency_name TEXT,
-        exchange_rate REAL NOT NULL,
-        date TEXT,
-        timestamptz TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        UNIQUE(currency, timestamptz)
-    );
-    """
-    # TODO: timestamp => timestamptz and UNIQUE(currency, timestamptz)
     try:
         cursor = conn.cursor()
-        cursor.execute(create_table_query)
+        cursor.execute(HISTORY_CREATE_TABLE_QUERY)
         conn.commit()
         logging.info(f"✅ Table {HISTORY_TABLE_NAME} created or already exists.")
         return True
@@ -145,6 +239,62 @@ def create_table(conn: sqlite3.Connection) -> bool:
         return False
 
 
+def table_exists(conn: sqlite3.Connection) -> bool:
+    """Check whether the history table has already been created.
+
+    Args:
+        conn: SQLite connection
+    """
+    cursor = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (HISTORY_TABLE_NAME,),
+    )
+    return cursor.fetchone() is not None
+
+
+def create_indexes(conn: sqlite3.Connection) -> bool:
+    """Create the history indexes if they don't exist.
+
+    - (currency, timestamptz) unique index backing INSERT OR IGNORE. Tables
+      created before it was split out carry an inline UNIQUE constraint
+      instead, which already covers the same columns. When it is built after
+      the initial bulk load, duplicate rows are deleted first (keeping the
+      first inserted), as nothing deduplicated them on the way in.
+    - The display_data and sync_data indexes (see create_read_indexes).
+
+    Args:
+        conn: SQLite connection
+    """
+    try:
+        logging.info("⌛ Building indexes...")
+        indexes = conn.execute(f"PRAGMA index_list({HISTORY_TABLE_NAME})").fetchall()
+        if not any(index[2] for index in indexes):
+            conn.execute(
+                f"""
+                DELETE FROM {HISTORY_TABLE_NAME}
+                WHERE id NOT IN (
+                    SELECT MIN(id) FROM {HISTORY_TABLE_NAME}
+                    GROUP BY currency, timestamptz
+                )
+                """
+            )
+            conn.execute(
+                f"""
+                CREATE UNIQUE INDEX IF NOT EXISTS ux_{HISTORY_TABLE_NAME}_currency_timestamptz
+                ON {HISTORY_TABLE_NAME}(currency, timestamptz)
+                """
+            )
+        create_read_indexes(
+            conn, HISTORY_TABLE_NAME, "timestamptz DESC, currency ASC"
+        )
+        conn.commit()
+        logging.info(f"✅ Indexes on {HISTORY_TABLE_NAME} are ready.")
+        return True
+    except sqlite3.Error as e:
+        logging.error(f"❌ Error creating indexes: {e}")
+        return False
+
+
 def insert_data(conn: sqlite3.Connection, df: pd.DataFrame) -> int:
     """Insert data into SQLite database.
 
@@ -153,65 +303,76 @@ def insert_data(conn: sqlite3.Connection, df: pd.DataFrame) -> int:
         df: DataFrame containing data to insert
 
     Returns:
-        Tuple of (inserted_count, skipped_count)
+        Number of rows inserted
     """
+    # transform_data returns a column-less frame when the window is empty
+    if df.empty:
+        logging.warning("⚠️ No rows to insert.")
+        return 0
+
     logging.info("⌛ Inserting data into SQL database...")
     inserted = 0
     skipped = 0
 
-    # More efficient batch insert using to_sql
-    try:
-        # Create a temporary DataFrame with formatted dates
-        insert_df = df.copy()
-        insert_df["date"] = insert_df["date"].dt.strftime("%Y-%m-%d")
-        insert_df["timestamptz"] = (
-            insert_df["timestamptz"]
-            .dt.strftime("%Y-%m-%dT%H:%M:%S")
-            .replace(tzinfo=pytz.UTC)
-        )
+    # Format dates once for the whole column instead of once per row
+    # (timestamptz is always UTC, so this matches Timestamp.isoformat()).
+    # The other columns are shared with df rather than copied.
+    insert_df = pd.DataFrame(
+        {
+            "currency": df["currency"],
+            "base_currency": df["base_currency"],
+            "currency_name": df["currency_name"],
+            "exchange_rate": df["exchange_rate"],
+            "date": np.datetime_as_string(
+                df["date"].to_numpy("datetime64[D]"), unit="D"
+            ),
+            "timestamptz": np.char.add(
+                np.datetime_as_string(
+                    df["timestamptz"].dt.tz_convert(None).to_numpy("datetime64[s]"),
+                    unit="s",
+                ),
+                "+00:00",
+            ),
+        },
+        copy=False,
+    )
 
-        # Use to_sql with if_exists='append' and index=False
-        insert_df.to_sql(
-            HISTORY_TABLE_NAME,
-            conn,
-            if_exists="append",
-            index=False,
-            method="multi",  # Faster for multiple rows
+    # Batch insert: one multi-row INSERT OR IGNORE per chunk
+    try:
+        inserted = (
+            insert_df.to_sql(
+                HISTORY_TABLE_NAME,
+                conn,
+                if_exists="append",
+                index=False,
+                method=insert_or_ignore,
+                chunksize=SQLITE_MAX_VARIABLES // len(insert_df.columns),
+            )
+            or 0
         )
-
-        # Get count of inserted rows
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT changes()")
-        inserted = cursor.fetchone()[0]
+        skipped = len(insert_df) - inserted
 
     except Exception as e:
         logging.error(f"❌ Batch insert failed: {e}")
         logging.info("⌛ Falling back to row-by-row insertion...")
 
-        # Fallback to row-by-row insertion
-        for _, row in df.iterrows():
+        # Fallback: reuse one cursor and one statement across chunked
+        # executemany calls; each chunk is its own transaction
+        cursor = conn.cursor()
+        for start in range(0, len(insert_df), INSERT_CHUNK_SIZE):
+            chunk = insert_df.iloc[start : start + INSERT_CHUNK_SIZE]
             try:
-                conn.execute(
-                    f"""
-                    INSERT OR IGNORE INTO {HISTORY_TABLE_NAME}
-                    (currency, base_currency, currency_name, exchange_rate, date, timestamptz)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        row.currency,
-                        row.base_currency,
-                        row.currency_name,
-                        row.exchange_rate,
-                        row.date.strftime("%Y-%m-%d"),
-                        row.timestamptz.isoformat(),
-                    ),
-                )
-                inserted += conn.total_changes
-            except Exception as e:
-                skipped += 1
-                logging.warning(f"⚠️ Row skipped: {e}")
+                with conn:
+                    cursor.execute("BEGIN IMMEDIATE")
+                    cursor.executemany(
+                        HISTORY_INSERT_QUERY,
+                        chunk.itertuples(index=False, name=None),
+                    )
+                inserted += cursor.rowcount
+            except sqlite3.Error as e:
+                logging.error(f"❌ Fallback insert failed for chunk at row {start}: {e}")
+        skipped = len(insert_df) - inserted
 
-    conn.commit()
     logging.info(
         f"✅ Insertion completed: {inserted} new rows inserted, {skipped} rows skipped."
     )
@@ -224,32 +385,45 @@ def display_data(conn: sqlite3.Connection) -> None:
     Args:
         conn: SQLite connection
     """
-    logging.info("Last 10 inserted rows:")
     query = f"""
         SELECT currency, base_currency, exchange_rate, timestamptz
         FROM {HISTORY_TABLE_NAME}
         ORDER BY timestamptz DESC, currency ASC
         LIMIT 10;
     """
-    df = pd.read_sql_query(query, conn)
-    print(tabulate(df, headers="keys", tablefmt="fancy_grid"))
+    display_last_rows(conn, query)
 
 
-def save_to_database(df: pd.DataFrame) -> bool:
+def save_to_database(
+    df: pd.DataFrame, conn: Optional[sqlite3.Connection] = None
+) -> bool:
     """Save the data to SQLite database using smaller function calls.
 
     Args:
         df: DataFrame to save
+        conn: SQLite connection (default: the module's shared connection)
 
     Returns:
         bool: True if successful, False otherwise
     """
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        if conn is None:
+            conn = get_stage_conn(HISTORY_TABLE_NAME)
+        with conn:
+            initial_load = not table_exists(conn)
             if not create_table(conn):
                 return False
 
+            # On the first load, insert into the bare table and build the
+            # indexes once afterwards instead of maintaining them per row
+            if not initial_load and not create_indexes(conn):
+                return False
+
             rows_inserted = insert_data(conn, df)
+
+            if initial_load and not create_indexes(conn):
+                return False
+
             if rows_inserted > 0:
                 display_data(conn)
                 return True
@@ -268,18 +442,23 @@ def run_csv_loading_process() -> None:
         logging.error("❌ Failed to create necessary directories. Exiting.")
         return
 
-    processed_csv_file = process_raw_csv_file(months=1)
-    if not processed_csv_file:
+    recent_df = process_raw_csv_file(months=1)
+    if recent_df is None:
         logging.error("❌ Failed to process CSV file. Exiting.")
         return
 
-    df = transform_data(processed_csv_file)
+    df = transform_data(recent_df)
 
     if df is not None:
         db_success = save_to_database(df)
 
         if db_success:
-            sync_data(DB_PATH, HISTORY_TABLE_NAME, source="csv")
+            sync_data(
+                DB_PATH,
+                HISTORY_TABLE_NAME,
+                source="csv",
+                on_conflict="currency,timestamptz",
+            )
             logging.info("✅ ETL:CSV process completed successfully.")
         else:
             logging.warning("⚠️ ETL:CSV process completed with warnings.")
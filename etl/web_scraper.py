@@ -1,27 +1,64 @@
+import re
 import requests
 import pandas as pd
 import sqlite3
-import pytz
 
+from html import unescape
+from io import StringIO
 from pathlib import Path
-from typing import List, Dict, Optional
-from datetime import datetime
+from typing import List, Optional, Tuple
+from datetime import datetime, timezone
 from bs4 import BeautifulSoup
-from tabulate import tabulate
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from etl.config import (
     logging,
     DB_PATH,
     WEBPAGE_URL,
+    REQUEST_TIMEOUT,
     DEFAULT_CURRENCY,
     PROCESSED_FILES_PATH,
     WEB_SCRAPPER_TABLE_NAME,
+    create_read_indexes,
+    display_last_rows,
+    get_stage_conn,
 )
 
 from utils.email_utils import alert_admin
 
 from services.supabase import sync_data
 
+# Keep-alive session: repeated scrapes from one process reuse the TCP/TLS
+# connection (requests already advertises gzip/deflate). Transient gateway
+# errors and connection failures are retried with exponential backoff.
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": "forex-etl/1.0"})
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=4,
+        max_retries=Retry(
+            total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504]
+        ),
+    ),
+)
+
+# Regex fast path over the page's fixed markup (see parse_html)
+_TIMESTAMP_FORMAT = "%b %d, %Y %H:%M %Z"  # e.g. "Apr 12, 2025 18:28 UTC"
+_TIMESTAMP_RE = re.compile(
+    r"<span[^>]*class=[\"']ratesTimestamp[\"'][^>]*>([^<]+)</span>"
+)
+_RATES_TABLE_MARKER = "tablesorter ratesTable"
+_RATE_ROW_RE = re.compile(
+    r"<td[^>]*>([^<]+)</td>\s*<td[^>]*>\s*<a[^>]*>\s*([\d.]+)\s*</a>"
+)
+
+# (currency_name, base_currency, exchange_rate, date, timestamptz), in the
+# column order of the table and the CSV
+RateRow = Tuple[str, str, float, str, str]
+
 
 def ensure_directories() -> bool:
     try:
@@ -36,7 +73,7 @@ def ensure_directories() -> bool:
 def fetch_html() -> Optional[str]:
     try:
         logging.info("⌛ Fetching exchange rate page...")
-        response = requests.get(WEBPAGE_URL)
+        response = _SESSION.get(WEBPAGE_URL, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         logging.info("✅ HTML content fetched successfully.")
         return response.text
@@ -45,80 +82,153 @@ def fetch_html() -> Optional[str]:
         return None
 
 
-def extract_timestamp(html: str) -> Optional[datetime]:
-    soup = BeautifulSoup(html, "html.parser")
+def parse_timestamp(raw: str) -> datetime:
+    dt = datetime.strptime(raw, _TIMESTAMP_FORMAT)
+    # Add explicit UTC timezone info
+    return dt.replace(tzinfo=timezone.utc)
+
+
+def build_rates(
+    names: List[str], rates: List[float], timestamp: datetime
+) -> Tuple[List[RateRow], pd.DataFrame]:
+    # Rows go straight to SQLite; the DataFrame is only used for the CSV
+    date_str = timestamp.date().isoformat()
+    timestamp_str = timestamp.isoformat()
+    rows = [
+        (name, DEFAULT_CURRENCY, rate, date_str, timestamp_str)
+        for name, rate in zip(names, rates)
+    ]
+    df = pd.DataFrame(
+        {
+            "currency_name": names,
+            "base_currency": DEFAULT_CURRENCY,
+            "exchange_rate": rates,
+            "date": date_str,
+            "timestamptz": timestamp_str,
+        }
+    )
+    return rows, df
+
+
+def extract_timestamp(soup: BeautifulSoup) -> Optional[datetime]:
     span = soup.find("span", class_="ratesTimestamp")
     if not span:
         logging.error("❌ Timestamp not found in page.")
         return None
-    raw = span.text.strip()  # e.g. "Apr 12, 2025 18:28 UTC"
+    raw = span.text.strip()
     try:
-        dt = datetime.strptime(raw, "%b %d, %Y %H:%M %Z")
-        # Add explicit UTC timezone info
-        dt = dt.replace(tzinfo=pytz.UTC)
-        return dt
+        return parse_timestamp(raw)
     except ValueError as e:
         logging.error(f"❌ Failed to parse timestamp: {e}")
         return None
 
 
-def parse_rates(html: str, timestamp: datetime) -> pd.DataFrame:
-    soup = BeautifulSoup(html, "html.parser")
-
+def parse_rates(
+    soup: BeautifulSoup, timestamp: datetime
+) -> Tuple[List[RateRow], pd.DataFrame]:
     try:
-        table = soup.find("table", class_="tablesorter ratesTable")
-        if not table:
-            logging.error("❌ Exchange rates table not found.")
-            alert_admin(f"Exchange rates table not found.", "Scraping Error")
-            return pd.DataFrame()
-
-        rows = table.find_all("tr")[1:] if table else []
-        if not rows:
+        rates_table = soup.find("table", class_="tablesorter ratesTable")
+        if rates_table is None:
+            raise ValueError("table not found")
+
+        # Only the table fragment is handed to read_html, not the whole page
+        table = pd.read_html(StringIO(str(rates_table)), flavor="lxml")[0]
+        if table.empty:
             logging.error("❌ No rows found in exchange rates table.")
-            alert_admin(f"No rows found in exchange rates table.", "Scraping Error")
-            return pd.DataFrame()
+            alert_admin("No rows found in exchange rates table.", "Scraping Error")
+            return [], pd.DataFrame()
+
+    except ValueError:
+        logging.error("❌ Exchange rates table not found.")
+        alert_admin("Exchange rates table not found.", "Scraping Error")
+        return [], pd.DataFrame()
 
     except Exception as e:
         logging.error(f"❌ Failed to find exchange rates table: {e}")
         alert_admin(f"Failed to find exchange rates table: {e}", "Scraping Error")
-        return pd.DataFrame()
-
-    data: List[Dict] = []
-    for row in rows:
-        cols = row.find_all("td")
-        if len(cols) < 2:
-            continue
-        currency_name = cols[0].get_text(strip=True)
-        exchange_rate = float(cols[1].get_text(strip=True))
-        data.append(
-            {
-                "currency_name": currency_name,
-                "base_currency": DEFAULT_CURRENCY,
-                "exchange_rate": exchange_rate,
-                "date": timestamp.date().isoformat(),
-                "timestamptz": timestamp.isoformat(),
-            }
-        )
+        return [], pd.DataFrame()
+
+    # First column holds the currency name, second the rate for 1 unit of base
+    rows, df = build_rates(
+        table.iloc[:, 0].astype(str).str.strip().tolist(),
+        table.iloc[:, 1].astype(float).tolist(),
+        timestamp,
+    )
+
+    logging.info(f"✅ Parsed {len(rows)} exchange rates.")
+    return rows, df
+
+
+def parse_html_fast(
+    html: str,
+) -> Optional[Tuple[datetime, List[RateRow], pd.DataFrame]]:
+    ts_match = _TIMESTAMP_RE.search(html)
+    start = html.find(_RATES_TABLE_MARKER)
+    if ts_match is None or start == -1:
+        return None
+    end = html.find("</table>", start)
+    if end == -1:
+        return None
 
-    logging.info(f"✅ Parsed {len(data)} exchange rates.")
-    return pd.DataFrame(data)
+    # Only trust the regex if it matched every data row (all rows but the header)
+    pairs = _RATE_ROW_RE.findall(html, start, end)
+    if not pairs or len(pairs) != html.count("<tr", start, end) - 1:
+        return None
+
+    try:
+        timestamp = parse_timestamp(ts_match.group(1).strip())
+        names = [unescape(name).strip() for name, _ in pairs]
+        rates = [float(rate) for _, rate in pairs]
+    except ValueError:
+        return None
+
+    rows, df = build_rates(names, rates, timestamp)
+    logging.info(f"✅ Parsed {len(rows)} exchange rates.")
+    return timestamp, rows, df
+
+
+def parse_html(
+    html: str,
+) -> Tuple[Optional[datetime], List[RateRow], pd.DataFrame]:
+    # Regex over the table slice first; the full DOM parse is only needed
+    # when the page markup no longer matches it
+    parsed = parse_html_fast(html)
+    if parsed is not None:
+        return parsed
+
+    logging.warning("⚠️ Fast parse failed, falling back to the HTML parser.")
+    soup = BeautifulSoup(html, "lxml")
+
+    timestamp = extract_timestamp(soup)
+    if not timestamp:
+        return None, [], pd.DataFrame()
+
+    return (timestamp, *parse_rates(soup, timestamp))
 
 
 def get_csv_path(date_str: str) -> Path:
     return PROCESSED_FILES_PATH / f"forex_scraped_{date_str}.csv"
 
 
+def read_last_timestamp(path: Path) -> Optional[str]:
+    # timestamptz is the last column, so only the file's tail needs reading
+    with open(path, "rb") as f:
+        f.seek(0, 2)
+        f.seek(max(0, f.tell() - 4096))
+        lines = f.read().decode("utf-8", errors="ignore").splitlines()
+    return lines[-1].rsplit(",", 1)[-1] if lines else None
+
+
 def save_to_csv(df: pd.DataFrame, date_str: str) -> bool:
     path = get_csv_path(date_str)
     try:
-        if path.exists():
-            existing_df = pd.read_csv(path)
-            combined = pd.concat([existing_df, df]).drop_duplicates(
-                subset=["currency_name", "timestamptz"]
-            )
-        else:
-            combined = df
-        combined.to_csv(path, index=False)
+        # Every row of a scrape shares the page timestamp: if it is the last one
+        # written, this page is already in the file. Otherwise append only.
+        timestamp = df["timestamptz"].iloc[0]
+        if path.exists() and read_last_timestamp(path) == timestamp:
+            logging.info(f"✅ Rates for {timestamp} already saved to {path}")
+            return True
+        df.to_csv(path, mode="a", header=not path.exists(), index=False)
         logging.info(f"✅ Data saved to {path}")
         return True
     except Exception as e:
@@ -141,6 +251,7 @@ def create_table(conn: sqlite3.Connection) -> bool:
     """
     try:
         conn.execute(query)
+        create_read_indexes(conn, WEB_SCRAPPER_TABLE_NAME, "timestamptz DESC")
         conn.commit()
         logging.info(f"✅ Table `{WEB_SCRAPPER_TABLE_NAME}` is ready.")
         return True
@@ -149,25 +260,17 @@ def create_table(conn: sqlite3.Connection) -> bool:
         return False
 
 
-def insert_data(conn: sqlite3.Connection, df: pd.DataFrame) -> int:
+def insert_data(conn: sqlite3.Connection, rows: List[RateRow]) -> int:
     query = f"""
         INSERT OR IGNORE INTO {WEB_SCRAPPER_TABLE_NAME}
         (currency_name, base_currency, exchange_rate, date, timestamptz)
         VALUES (?, ?, ?, ?, ?)
     """
-    data = [
-        (
-            row["currency_name"],
-            row["base_currency"],
-            row["exchange_rate"],
-            row["date"],
-            row["timestamptz"],
-        )
-        for _, row in df.iterrows()
-    ]
     try:
         cursor = conn.cursor()
-        cursor.executemany(query, data)
+        # Take the write lock up front: other ETL stages may be writing too
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.executemany(query, rows)
         conn.commit()
         count = cursor.rowcount
         logging.info(f"✅ {count} rows inserted into database.")
@@ -185,20 +288,19 @@ def display_data(conn: sqlite3.Connection) -> None:
         ORDER BY timestamptz DESC
         LIMIT 10;
     """
-    try:
-        df = pd.read_sql_query(query, conn)
-        logging.info("Last 10 inserted rows:")
-        print(tabulate(df, headers="keys", tablefmt="fancy_grid"))
-    except sqlite3.Error as e:
-        logging.error(f"❌ Error displaying data: {e}")
+    display_last_rows(conn, query)
 
 
-def save_to_db(df: pd.DataFrame) -> bool:
+def save_to_db(
+    rows: List[RateRow], conn: Optional[sqlite3.Connection] = None
+) -> bool:
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        if conn is None:
+            conn = get_stage_conn(WEB_SCRAPPER_TABLE_NAME)
+        with conn:
             if not create_table(conn):
                 return False
-            rows_inserted = insert_data(conn, df)
+            rows_inserted = insert_data(conn, rows)
             if rows_inserted > 0:
                 display_data(conn)
             return True
@@ -216,20 +318,24 @@ def run_web_scrapping_process() -> None:
     if not html:
         return
 
-    timestamp = extract_timestamp(html)
+    timestamp, rows, df = parse_html(html)
     if not timestamp:
         return
 
-    df = parse_rates(html, timestamp)
-    if df.empty:
+    if not rows:
         logging.warning("⚠️ No data extracted.")
         return
 
     csv_ok = save_to_csv(df, timestamp.date().isoformat())
-    db_ok = save_to_db(df)
+    db_ok = save_to_db(rows)
 
     if csv_ok and db_ok:
-        sync_data(DB_PATH, WEB_SCRAPPER_TABLE_NAME, source="web_scraper")
+        sync_data(
+            DB_PATH,
+            WEB_SCRAPPER_TABLE_NAME,
+            source="web_scraper",
+            on_conflict="currency,currency_name,timestamptz",
+        )
         logging.info("✅ ETL:Web Scraping process completed successfully.")
     else:
         logging.warning("⚠️ ETL:Web Scraping process completed with warnings.")
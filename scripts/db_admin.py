@@ -0,0 +1,180 @@
+"""Outils d'administration de la base SQLite et des données brutes.
+
+Usage :
+    python scripts/db_admin.py inspect [--table NOM | --all]
+    python scripts/db_admin.py drop NOM [--yes]
+    python scripts/db_admin.py extract-recent MOIS
+
+Les dépendances lourdes (tabulate, pyarrow...) ne sont importées que par la
+sous-commande qui en a besoin.
+"""
+
+import argparse
+from pathlib import Path
+
+from db_utils import DB_PATH, connect, connect_readonly, display_table_data, list_tables
+
+DEFAULT_INSPECT_TABLE = "forex_rates_history"
+RAW_CSV_PATH = Path("data/raw/daily_forex_rates.csv")
+PROCESSED_DIR = Path("data/processed")
+
+
+def inspect(args):
+    conn = connect_readonly(args.db)
+    cursor = conn.cursor()
+
+    print("📌 Tables dans la base de données:")
+    tables = list_tables(cursor)
+    print(tables)
+
+    if args.all:
+        for table in tables:
+            display_table_data(cursor, table)
+    elif args.table in tables:
+        display_table_data(cursor, args.table)
+    else:
+        print(f"❌ Table '{args.table}' introuvable.")
+
+    conn.close()
+
+
+def drop(args):
+    conn = connect(args.db)
+    cursor = conn.cursor()
+
+    if args.table not in list_tables(cursor):
+        print(f"❌ Table '{args.table}' introuvable.")
+        conn.close()
+        return
+
+    if not args.yes:
+        answer = input(f"⚠️ Supprimer la table '{args.table}' ? (o/N): ").strip()
+        if answer.lower() != "o":
+            print("Abandon.")
+            conn.close()
+            return
+
+    cursor.execute(f"DROP TABLE IF EXISTS {args.table}")
+    conn.commit()
+    conn.close()
+    print(f"✅ Table '{args.table}' supprimée.")
+
+
+def extract_recent(args):
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+
+    months = args.months
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Lecture multithread par le lecteur CSV d'Arrow ; les dates invalides
+    # deviennent nulles puis sont écartées
+    table = pacsv.read_csv(
+        args.input,
+        convert_options=pacsv.ConvertOptions(column_types={"date": pa.string()}),
+    )
+    parsed = pc.cast(
+        pc.strptime(table["date"], format="%Y-%m-%d", unit="s", error_is_null=True),
+        pa.date32(),
+    )
+    table = table.set_column(table.schema.get_field_index("date"), "date", parsed)
+    if parsed.null_count:
+        table = table.filter(pc.is_valid(table["date"]))
+
+    today = pd.Timestamp.today()
+    start_date = today - pd.DateOffset(months=months)
+
+    # Le fichier brut est trié par date (du plus récent au plus ancien) : on
+    # travaille sur une vue croissante pour trouver les bornes par recherche
+    # dichotomique, puis on découpe la plage sans masque ni copie (table.slice)
+    dates = table["date"].to_numpy().astype("datetime64[ns]")
+    start = np.datetime64(start_date.to_datetime64())
+    end = np.datetime64(today.to_datetime64())
+    if np.all(dates[:-1] >= dates[1:]):
+        ascending = dates[::-1]
+        first = ascending.searchsorted(start, side="left")
+        last = ascending.searchsorted(end, side="right")
+        recent = table.slice(len(dates) - last, last - first)
+    elif np.all(dates[:-1] <= dates[1:]):
+        first = dates.searchsorted(start, side="left")
+        last = dates.searchsorted(end, side="right")
+        recent = table.slice(first, last - first)
+    else:
+        recent = table.filter(pa.array((dates >= start) & (dates <= end)))
+
+    output_csv = PROCESSED_DIR / f"forex_rates_{months}m.csv"
+
+    # Même format que l'ancien to_csv : aucun champ entre guillemets (aucun ne
+    # contient de virgule). Arrow met toujours l'en-tête entre guillemets, il
+    # est donc écrit à part
+    with open(output_csv, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(recent.column_names) + "\n")
+    with open(output_csv, "ab") as f:
+        pacsv.write_csv(
+            recent,
+            f,
+            write_options=pacsv.WriteOptions(
+                include_header=False, quoting_style="none"
+            ),
+        )
+
+    print(
+        f"✅ Données de {start_date.date()} à {today.date()} sauvegardées dans : {output_csv}"
+    )
+    print(f"{recent.num_rows} lignes extraites")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Administration de la base SQLite du pipeline Forex."
+    )
+    parser.add_argument(
+        "--db",
+        default=DB_PATH,
+        help=f"chemin de la base SQLite (défaut: {DB_PATH})",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    inspect_parser = subparsers.add_parser(
+        "inspect", help="afficher les 10 dernières lignes d'une ou de toutes les tables"
+    )
+    group = inspect_parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--table",
+        default=DEFAULT_INSPECT_TABLE,
+        help=f"table à inspecter (défaut: {DEFAULT_INSPECT_TABLE})",
+    )
+    group.add_argument("--all", action="store_true", help="inspecter toutes les tables")
+    inspect_parser.set_defaults(func=inspect)
+
+    drop_parser = subparsers.add_parser("drop", help="supprimer une table")
+    drop_parser.add_argument("table", help="table à supprimer")
+    drop_parser.add_argument(
+        "--yes", action="store_true", help="ne pas demander de confirmation"
+    )
+    drop_parser.set_defaults(func=drop)
+
+    extract_parser = subparsers.add_parser(
+        "extract-recent",
+        help="extraire les N derniers mois du CSV brut vers data/processed",
+    )
+    extract_parser.add_argument(
+        "months", type=int, help="nombre de mois à garder (ex: 10)"
+    )
+    extract_parser.add_argument(
+        "--input",
+        type=Path,
+        default=RAW_CSV_PATH,
+        help=f"CSV brut à lire (défaut: {RAW_CSV_PATH})",
+    )
+    extract_parser.set_defaults(func=extract_recent)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
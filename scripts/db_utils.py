@@ -0,0 +1,57 @@
+import sqlite3
+
+DB_PATH = "database/forex_data.db"
+
+# Inspection en lecture seule : aucune écriture possible, cache de 64 Mo et
+# lecture du fichier via mmap (256 Mo)
+READONLY_PRAGMAS = """
+    PRAGMA query_only = ON;
+    PRAGMA cache_size = -65536;
+    PRAGMA mmap_size = 268435456;
+"""
+
+
+def connect(db_path=DB_PATH):
+    return sqlite3.connect(db_path)
+
+
+def connect_readonly(db_path=DB_PATH):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    conn.executescript(READONLY_PRAGMAS)
+    return conn
+
+
+def list_tables(cursor):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+    return [row[0] for row in cursor.fetchall()]
+
+
+def display_table_data(cursor, table_name):
+    # Import différé : seul l'affichage a besoin de tabulate
+    from tabulate import tabulate
+
+    # Lire les noms de colonnes
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    column_names = [col[1] for col in cursor.fetchall()]
+
+    # Construire ORDER BY selon les colonnes existantes (toutes les tables
+    # n'ont pas de colonne date, ex: sync_state)
+    order_columns = []
+    if "timestamptz" in column_names:
+        order_columns.append("timestamptz DESC")
+    elif "date" in column_names:
+        order_columns.append("date DESC")
+    if "currency" in column_names:
+        order_columns.append("currency ASC")
+    order_clause = f"ORDER BY {', '.join(order_columns)}" if order_columns else ""
+
+    # Exécuter la requête
+    try:
+        query = f"SELECT * FROM {table_name} {order_clause} LIMIT 10;"
+        cursor.execute(query)
+        rows = cursor.fetchall()
+        column_names = [desc[0] for desc in cursor.description]
+        print(f"\n📊 Table: {table_name}")
+        print(tabulate(rows, headers=column_names, tablefmt="fancy_grid"))
+    except Exception as e:
+        print(f"❌ Erreur lors de l'affichage de la table '{table_name}': {e}")
@@ -2,9 +2,12 @@ import sqlite3
 import pandas as pd
 import os
 
+from typing import Optional
+
+from postgrest.types import ReturnMethod
 from supabase import create_client, Client
 
-from etl.config import logging
+from etl.config import logging, open_db
 from utils.email_utils import alert_admin
 
 
@@ -13,6 +16,10 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+SUPABASE_TABLE_NAME = "forex_rates"
+SUPABASE_BATCH_SIZE = 1000
+SYNC_STATE_TABLE_NAME = "sync_state"
+
 
 def get_columns_except_id(conn, table_name: str) -> str:
     cursor = conn.execute(f"PRAGMA table_info({table_name})")
@@ -20,10 +27,48 @@ def get_columns_except_id(conn, table_name: str) -> str:
     return ", ".join(columns)
 
 
-def upload_to_supabase(df: pd.DataFrame, source: str = ""):
+def get_last_sync(conn: sqlite3.Connection, table_name: str) -> Optional[str]:
+    """Return the created_at of the last row synced from table_name, if any."""
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {SYNC_STATE_TABLE_NAME} (
+            table_name TEXT PRIMARY KEY,
+            last_sync TEXT NOT NULL
+        )
+        """
+    )
+    row = conn.execute(
+        f"SELECT last_sync FROM {SYNC_STATE_TABLE_NAME} WHERE table_name = ?",
+        (table_name,),
+    ).fetchone()
+    return row[0] if row else None
+
+
+def set_last_sync(conn: sqlite3.Connection, table_name: str, last_sync: str):
+    """Record the created_at of the last row synced from table_name."""
+    with conn:
+        conn.execute(
+            f"INSERT OR REPLACE INTO {SYNC_STATE_TABLE_NAME} (table_name, last_sync) "
+            "VALUES (?, ?)",
+            (table_name, last_sync),
+        )
+
+
+def upload_to_supabase(
+    df: pd.DataFrame, source: str = "", on_conflict: Optional[str] = None
+) -> bool:
     """
-    Upload a pandas DataFrame to Supabase table 'forex_rates'.
+    Upload a pandas DataFrame to Supabase table 'forex_rates' in batches.
     Optionally adds a source tag (e.g. 'csv', 'api', 'scraper')
+
+    Args:
+        df: Rows to upload.
+        source: Optional source tag.
+        on_conflict: Comma-separated unique columns; when set, rows are
+            upserted so a retried batch does not create duplicates.
+
+    Returns:
+        bool: True if every batch was uploaded, False otherwise
     """
 
     if source:
@@ -31,39 +76,76 @@ def upload_to_supabase(df: pd.DataFrame, source: str = ""):
 
     data = df.to_dict(orient="records")
 
-    try:
-        response = supabase.table("forex_rates").insert(data).execute()
-
-        logging.info(f"✅ [Sync] {len(df)} new rows synced to Supabase.")
-    except Exception as e:
-        logging.error(f"❌ [Sync] Failed to sync data to Supabase: {e}")
-
-
-def sync_data(db_path: str, table_name: str, source: str):
+    # Stop at the first failed batch: the caller then keeps the previous sync
+    # state, and the retried rows are upserted rather than duplicated
+    for start in range(0, len(data), SUPABASE_BATCH_SIZE):
+        batch = data[start : start + SUPABASE_BATCH_SIZE]
+        end = start + len(batch)
+        try:
+            # returning=minimal: PostgREST answers 201 with an empty body instead
+            # of serialising every written row back to us
+            table = supabase.table(SUPABASE_TABLE_NAME)
+            if on_conflict:
+                table.upsert(
+                    batch, on_conflict=on_conflict, returning=ReturnMethod.minimal
+                ).execute()
+            else:
+                table.insert(batch, returning=ReturnMethod.minimal).execute()
+        except Exception as e:
+            logging.error(
+                f"❌ [Sync] Failed to sync rows {start + 1}-{end} of {len(data)} to Supabase: {e}"
+            )
+            return False
+
+    logging.info(f"✅ [Sync] {len(df)} new rows synced to Supabase.")
+    return True
+
+
+def sync_data(
+    db_path: str, table_name: str, source: str, on_conflict: Optional[str] = None
+):
     """
-    Sync newly inserted data (last 5 minutes) from local SQLite DB to Supabase.
+    Sync rows inserted since the last successful sync from local SQLite DB to Supabase.
+
+    The first sync of a table (no recorded state) falls back to rows
+    created in the last 20 minutes.
 
     Args:
         db_path: Path to the local SQLite database.
         table_name: Table to query (default: 'forex_api').
         source: Optional source tag for Supabase (default: 'api').
+        on_conflict: Unique columns to upsert on (see upload_to_supabase).
     """
+    conn = None
     try:
-        conn = sqlite3.connect(db_path)
+        conn = open_db(db_path)
 
         columns = get_columns_except_id(conn, table_name)
+        last_sync = get_last_sync(conn, table_name)
 
-        # Query to fetch data from the last 20 minutes
         query = f"""
             SELECT {columns}
             FROM {table_name}
-            WHERE created_at >= datetime('now', '-20 minutes')
+            WHERE created_at > COALESCE(?, datetime('now', '-20 minutes'))
         """
 
-        df = pd.read_sql_query(query, conn)
-
-        if not df.empty:
-            upload_to_supabase(df, source)
+        # Read and upload one batch-sized chunk at a time. created_at only has
+        # second resolution, so a chunk boundary can split rows sharing a
+        # value: the state is only advanced once every chunk is uploaded.
+        synced_until = None
+        for chunk in pd.read_sql_query(
+            query, conn, params=(last_sync,), chunksize=SUPABASE_BATCH_SIZE
+        ):
+            if chunk.empty:
+                continue
+            if not upload_to_supabase(chunk, source, on_conflict):
+                return
+            chunk_max = chunk["created_at"].max()
+            if synced_until is None or chunk_max > synced_until:
+                synced_until = chunk_max
+
+        if synced_until is not None:
+            set_last_sync(conn, table_name, synced_until)
 
     except Exception as e:
         logging.error(f"❌ [Sync] Failed to sync data to Supabase: {e}")
@@ -73,4 +155,5 @@ def sync_data(db_path: str, table_name: str, source: str):
         )
 
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
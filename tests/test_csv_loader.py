@@ -0,0 +1,46 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from etl import csv_loader
+
+
+class EmptyWindowTest(unittest.TestCase):
+    """A raw CSV with no row in the requested window loads nothing, without raising."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.raw_csv = Path(tmp.name) / "daily_forex_rates.csv"
+        self.raw_csv.write_text(
+            "currency,base_currency,currency_name,exchange_rate,date\n"
+            "GHS,EUR,Ghanaian Cedi,17.312157,2025-04-11\n"
+            "CNH,EUR,,8.2,2025-04-10\n"
+        )
+        self.conn = sqlite3.connect(":memory:")
+        self.addCleanup(self.conn.close)
+
+    def test_empty_window_is_not_saved(self):
+        with mock.patch.object(csv_loader, "RAW_CSV_FILE_PATH", self.raw_csv):
+            with mock.patch("pandas.Timestamp.today") as today:
+                today.return_value = csv_loader.pd.Timestamp("2026-01-01")
+                recent_df = csv_loader.process_raw_csv_file(months=1)
+
+        self.assertIsNotNone(recent_df)
+        self.assertTrue(recent_df.empty)
+
+        df = csv_loader.transform_data(recent_df)
+        self.assertTrue(df.empty)
+        self.assertEqual(csv_loader.insert_data(self.conn, df), 0)
+        self.assertFalse(csv_loader.save_to_database(df, self.conn))
+
+        count = self.conn.execute(
+            f"SELECT COUNT(*) FROM {csv_loader.HISTORY_TABLE_NAME}"
+        ).fetchone()[0]
+        self.assertEqual(count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
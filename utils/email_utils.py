@@ -1,5 +1,9 @@
+import atexit
 import os
 import smtplib
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from etl.config import logging
@@ -7,22 +11,22 @@ from etl.config import logging
 # from dotenv import load_dotenv
 # load_dotenv()
 
+# Alerts raised within this window are sent together in a single email
+ALERT_DEBOUNCE_SECONDS = 60
 
-def alert_admin(message: str, subject: str = "Alerte ETL") -> bool:
-    """
-    Sends an alert email to the admin via SMTP.
+_lock = threading.Lock()
+_pending: Deque[Tuple[str, str]] = deque()
+_timer: Optional[threading.Timer] = None
+_smtp: Optional[smtplib.SMTP] = None
 
-    Args:
-        message: The alert message content
-        subject: The email subject line (default: "Alerte Scraping")
 
-    Returns:
-        bool: True if email was sent successfully, False otherwise
+def get_email_config() -> Optional[Dict[str, str]]:
     """
-    logging.error(f"ALERT ADMIN: {message}")
-    logging.info(f"Sending alert email to admin...")
+    Read the email configuration from the environment.
 
-    # Get email configuration from environment
+    Returns:
+        dict: Email settings if all of them are set, None otherwise
+    """
     email_config = {
         "sender_email": os.getenv("EMAIL_ADDRESS"),
         "app_password": os.getenv("EMAIL_PASSWORD"),
@@ -32,43 +36,142 @@ def alert_admin(message: str, subject: str = "Alerte ETL") -> bool:
     }
 
     # Validate required email configuration
-    required_fields = [
-        "sender_email",
-        "app_password",
-        "receiver_email",
-        "smtp_server",
-        "smtp_port",
-    ]
-    for field in required_fields:
-        if not email_config.get(field):
+    for field, value in email_config.items():
+        if not value:
             logging.warning(f"Missing email configuration: {field}. Alert not sent.")
-            return False
+            return None
+
+    return email_config
+
 
+def _close_smtp() -> None:
+    global _smtp
+    if _smtp is not None:
+        try:
+            _smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        _smtp = None
+
+
+def _get_smtp(email_config: Dict[str, str]) -> smtplib.SMTP:
+    """
+    Return the logged-in SMTP connection, reconnecting if the server dropped it.
+
+    Must be called with _lock held.
+    """
+    global _smtp
+    if _smtp is not None:
+        try:
+            if _smtp.noop()[0] == 250:
+                return _smtp
+        except (smtplib.SMTPException, OSError):
+            pass
+        _close_smtp()
+
+    smtp = smtplib.SMTP(email_config["smtp_server"], int(email_config["smtp_port"]))
     try:
-        # Create email message
-        msg = MIMEMultipart()
-        msg["From"] = email_config["sender_email"]
-        msg["To"] = email_config["receiver_email"]
-        msg["Subject"] = subject
-        msg.attach(MIMEText(message))
-
-        # Send email
-        with smtplib.SMTP(
-            email_config["smtp_server"], int(email_config["smtp_port"])
-        ) as smtp:
-            smtp.starttls()
-            smtp.login(email_config["sender_email"], email_config["app_password"])
-            smtp.send_message(msg)
-
-        logging.info("Alert email sent successfully.")
-        return True
-
-    except smtplib.SMTPAuthenticationError:
-        logging.error("SMTP authentication failed. Check credentials.")
-        return False
-    except smtplib.SMTPException as e:
-        logging.error(f"SMTP error occurred: {e}")
+        smtp.starttls()
+        smtp.login(email_config["sender_email"], email_config["app_password"])
+    except Exception:
+        smtp.close()
+        raise
+    _smtp = smtp
+    return smtp
+
+
+def alert_admin(message: str, subject: str = "Alerte ETL") -> bool:
+    """
+    Queue an alert email to the admin.
+
+    Alerts are sent by flush_alerts, at most ALERT_DEBOUNCE_SECONDS after the
+    first queued one or when the process exits, grouped into a single email.
+
+    Args:
+        message: The alert message content
+        subject: The email subject line (default: "Alerte ETL")
+
+    Returns:
+        bool: True if the alert was queued, False if email is not configured
+    """
+    global _timer
+    logging.error(f"ALERT ADMIN: {message}")
+
+    if get_email_config() is None:
         return False
-    except Exception as e:
-        logging.error(f"Failed to send alert email: {e}")
+
+    with _lock:
+        _pending.append((subject, message))
+        if _timer is None:
+            _timer = threading.Timer(ALERT_DEBOUNCE_SECONDS, flush_alerts)
+            _timer.daemon = True
+            _timer.start()
+
+    logging.info("Alert queued for the admin email.")
+    return True
+
+
+def flush_alerts() -> bool:
+    """
+    Send all queued alerts to the admin in one email via SMTP.
+
+    Returns:
+        bool: True if the email was sent (or nothing was queued), False otherwise
+    """
+    global _timer
+    with _lock:
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+        if not _pending:
+            return True
+
+        alerts = list(_pending)
+        _pending.clear()
+
+        email_config = get_email_config()
+        if email_config is None:
+            return False
+
+        if len(alerts) == 1:
+            subject, body = alerts[0]
+        else:
+            subject = f"{alerts[0][0]} (+{len(alerts) - 1} autres alertes)"
+            body = "\n\n".join(f"[{s}] {m}" for s, m in alerts)
+
+        logging.info(f"Sending alert email to admin ({len(alerts)} alert(s))...")
+
+        try:
+            # Create email message
+            msg = MIMEMultipart()
+            msg["From"] = email_config["sender_email"]
+            msg["To"] = email_config["receiver_email"]
+            msg["Subject"] = subject
+            msg.attach(MIMEText(body))
+
+            # Send email over the persistent connection
+            _get_smtp(email_config).send_message(msg)
+
+            logging.info("Alert email sent successfully.")
+            return True
+
+        except smtplib.SMTPAuthenticationError:
+            logging.error("SMTP authentication failed. Check credentials.")
+        except smtplib.SMTPException as e:
+            logging.error(f"SMTP error occurred: {e}")
+        except Exception as e:
+            logging.error(f"Failed to send alert email: {e}")
+
+        # Start from a fresh connection next time
+        _close_smtp()
         return False
+
+
+def _shutdown() -> None:
+    flush_alerts()
+    with _lock:
+        _close_smtp()
+
+
+# Short ETL runs usually exit before the debounce window ends
+atexit.register(_shutdown)